@@ -1,5 +1,7 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
+import pickle
 from pathlib import Path
+import pytest
 import numpy as np
 
 import torch
@@ -28,6 +30,19 @@ def test_get_dataset():
     assert isinstance(target, Dict)
 
 
+def test_get_dataset_pickle():
+    train_dataset = data_helper.get_dataset(data_root='data-bin', mode='train')
+    dataset = pickle.loads(pickle.dumps(train_dataset))
+    # The COCO api is rebuilt from the annotation file
+    assert dataset.coco is not train_dataset.coco
+    assert sorted(dataset.coco.getImgIds()) == sorted(train_dataset.coco.getImgIds())
+    assert dataset.ids == train_dataset.ids
+
+    image, target = dataset[0]
+    assert isinstance(image, Tensor)
+    assert isinstance(target, Dict)
+
+
 def test_get_dataloader():
     batch_size = 8
     data_loader = data_helper.get_dataloader(data_root='data-bin', mode='train', batch_size=batch_size)
@@ -45,6 +60,29 @@ def test_get_dataloader():
     assert isinstance(targets[0]["orig_size"], Tensor)
 
 
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA unavailable")
+def test_get_dataloader_with_prefetch():
+    batch_size = 8
+    data_loader = data_helper.get_dataloader(data_root='data-bin', mode='train', batch_size=batch_size,
+                                             prefetch=True)
+    assert data_loader.loader.pin_memory
+    # Test the prefetched batches
+    images, targets = next(iter(data_loader))
+
+    assert len(images) == batch_size
+    assert images[0].is_cuda
+    assert len(targets) == batch_size
+    assert targets[0]["boxes"].is_cuda
+
+
+@pytest.mark.skipif(torch.cuda.is_available(), reason="CUDA available")
+def test_get_dataloader_with_prefetch_on_cpu(caplog):
+    data_loader = data_helper.get_dataloader(data_root='data-bin', mode='train', prefetch=True)
+    # Falls back to the DataLoader when there is no device to prefetch to
+    assert isinstance(data_loader, torch.utils.data.DataLoader)
+    assert "CUDA is unavailable" in caplog.text
+
+
 def test_detection_data_module():
     # Setup the DataModule
     batch_size = 4
@@ -64,9 +102,29 @@ def test_detection_data_module():
     assert isinstance(targets[0]["labels"], Tensor)
 
 
+def test_detection_data_module_with_workers():
+    # Setup the DataModule
+    batch_size = 4
+    train_dataset = data_helper.get_dataset(data_root='data-bin', mode='train')
+    data_module = DetectionDataModule(train_dataset, batch_size=batch_size, num_workers=2)
+
+    data_loader = data_module.train_dataloader()
+    assert data_loader.persistent_workers
+    assert data_loader.prefetch_factor == 4
+    images, targets = next(iter(data_loader))
+    assert len(images) == batch_size
+    assert len(targets) == batch_size
+
+
 def test_prepare_coco128():
     data_path = Path('data-bin')
     coco128_dirname = 'coco128'
     data_helper.prepare_coco128(data_path, dirname=coco128_dirname)
     annotation_file = data_path / coco128_dirname / 'annotations' / 'instances_train2017.json'
     assert annotation_file.is_file()
+    prepared_file = data_path / coco128_dirname / 'annotations' / '.prepared.ok'
+    assert prepared_file.is_file()
+    # The preparation is memoized in the process
+    hits = data_helper._prepare_coco128.cache_info().hits
+    data_helper.prepare_coco128(data_path, dirname=coco128_dirname)
+    assert data_helper._prepare_coco128.cache_info().hits == hits + 1
@@ -1,4 +1,5 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
+import pickle
 import pytest
 from pathlib import Path
 
@@ -90,6 +91,20 @@ def test_training_step():
     trainer.fit(model, data_module)
 
 
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA unavailable")
+def test_mixed_precision():
+    # Setup the DataModule
+    data_path = 'data-bin'
+    train_dataset = data_helper.get_dataset(data_root=data_path, mode='train')
+    val_dataset = data_helper.get_dataset(data_root=data_path, mode='val')
+    data_module = DetectionDataModule(train_dataset, val_dataset, batch_size=4)
+    # Load model
+    model = yolov5s()
+    # Trainer with the automatic mixed precision
+    trainer = pl.Trainer(gpus=1, precision=16, fast_dev_run=True)
+    trainer.validate(model, val_dataloaders=data_module.val_dataloader())
+
+
 def test_vanilla_coco_evaluator():
     # Acquire the images and labels from the coco128 dataset
     val_dataloader = data_helper.get_dataloader(data_root='data-bin', mode='val')
@@ -107,6 +122,31 @@ def test_vanilla_coco_evaluator():
     assert results['AP50'] > 59.9
 
 
+def test_coco_evaluator_pickle():
+    # Acquire the annotation file
+    data_path = Path('data-bin')
+    coco128_dirname = 'coco128'
+    data_helper.prepare_coco128(data_path, dirname=coco128_dirname)
+    annotation_file = data_path / coco128_dirname / 'annotations' / 'instances_train2017.json'
+
+    evaluator = COCOEvaluator(annotation_file)
+    coco_evaluator = pickle.loads(pickle.dumps(evaluator))
+    # The COCO api and the COCOeval are rebuilt from the annotation file
+    assert coco_evaluator.coco_gt is not evaluator.coco_gt
+    assert sorted(coco_evaluator.coco_gt.getImgIds()) == sorted(evaluator.coco_gt.getImgIds())
+    assert coco_evaluator.coco_eval.cocoGt is coco_evaluator.coco_gt
+
+    # Evaluate the ground truths of a single batch as the predictions
+    val_dataloader = data_helper.get_dataloader(data_root=data_path, mode='val')
+    _, targets = next(iter(val_dataloader))
+    preds = [{'boxes': t['boxes'], 'labels': t['labels'], 'scores': torch.ones_like(t['labels'], dtype=torch.float)}
+             for t in targets]
+    coco_evaluator.update(preds, targets)
+
+    results = coco_evaluator.compute()
+    assert results['AP50'] > 99.0
+
+
 def test_test_epoch_end():
     # Acquire the annotation file
     data_path = Path('data-bin')
@@ -1,8 +1,10 @@
 # Copyright (c) 2020, Zhiqiang Wang. All Rights Reserved.
 import torch
 from torch import Tensor
+from torchvision.models._utils import IntermediateLayerGetter
 
-from yolort.models.backbone_utils import darknet_pan_backbone
+from yolort.models import darknet
+from yolort.models.backbone_utils import darknet_pan_backbone, IntermediateLayerSequential
 from yolort.models.transformer import darknet_tan_backbone
 from yolort.models.anchor_utils import AnchorGenerator
 from yolort.models.box_head import YOLOHead, PostProcess, SetCriterion
@@ -53,6 +55,24 @@ class ModelTester(TestCase):
 
         return head_outputs
 
+    def test_intermediate_layer_sequential(self):
+        backbone = darknet.darknet_s_r4_0().features
+        return_layers = {'4': '0', '6': '1', '8': '2'}
+        body = IntermediateLayerGetter(backbone, return_layers=return_layers)
+        body_sequential = IntermediateLayerSequential(backbone, [4, 6, 8])
+        # The module states are compatible with the released checkpoints
+        self.assertEqual(list(body.state_dict().keys()), list(body_sequential.state_dict().keys()))
+
+        body.eval()
+        body_sequential.eval()
+        x = torch.rand(2, 3, 416, 352)
+        out = list(body(x).values())
+        out_sequential = body_sequential(x)
+        self.assertEqual(len(out_sequential), 3)
+        for o, o_sequential in zip(out, out_sequential):
+            self.assertTrue(o.equal(o_sequential))
+        self.check_jit_scriptable(body_sequential, (x,))
+
     def _init_test_backbone_with_pan_r3_1(self):
         backbone_name = 'darknet_s_r3_1'
         depth_multiple = 0.33
@@ -95,6 +115,55 @@ class ModelTester(TestCase):
         self.assertEqual(tuple(out[2].shape), (N, *out_shape[2]))
         self.check_jit_scriptable(model, (x,))
 
+    def test_backbone_channels_last(self):
+        N, H, W = 2, 416, 352
+        backbone_name = 'darknet_s_r4_0'
+        depth_multiple = 0.33
+        width_multiple = 0.5
+
+        x = torch.rand(N, 3, H, W)
+        for backbone_fn in [darknet_pan_backbone, darknet_tan_backbone]:
+            model = backbone_fn(backbone_name, depth_multiple, width_multiple)
+            model_cl = backbone_fn(backbone_name, depth_multiple, width_multiple, channels_last=True)
+            model_cl.load_state_dict(model.state_dict())
+            model.eval()
+            model_cl.eval()
+            for m in model_cl.modules():
+                if isinstance(m, torch.nn.Conv2d):
+                    self.assertTrue(m.weight.is_contiguous(memory_format=torch.channels_last))
+
+            out = model(x)
+            out_cl = model_cl(x)
+            for o, o_cl in zip(out, out_cl):
+                torch.testing.assert_allclose(o, o_cl, rtol=1e-03, atol=1e-04)
+
+    def test_backbone_with_pan_gradient_checkpointing(self):
+        N, H, W = 2, 416, 352
+        backbone_name = 'darknet_s_r4_0'
+        depth_multiple = 0.33
+        width_multiple = 0.5
+
+        x = torch.rand(N, 3, H, W)
+        model = darknet_pan_backbone(backbone_name, depth_multiple, width_multiple)
+        model_ckpt = darknet_pan_backbone(backbone_name, depth_multiple, width_multiple,
+                                          gradient_checkpointing=True)
+        model_ckpt.load_state_dict(model.state_dict())
+        model.train()
+        model_ckpt.train()
+
+        out = model(x)
+        out_ckpt = model_ckpt(x)
+        for o, o_ckpt in zip(out, out_ckpt):
+            torch.testing.assert_allclose(o, o_ckpt)
+
+        sum(o.sum() for o in out).backward()
+        sum(o.sum() for o in out_ckpt).backward()
+        for p, p_ckpt in zip(model.parameters(), model_ckpt.parameters()):
+            torch.testing.assert_allclose(p.grad, p_ckpt.grad, rtol=1e-03, atol=1e-04)
+        # The running statistics of the batch norms are updated only once
+        for b, b_ckpt in zip(model.buffers(), model_ckpt.buffers()):
+            torch.testing.assert_allclose(b, b_ckpt)
+
     def _init_test_backbone_with_pan_tr(self):
         backbone_name = 'darknet_s_r4_0'
         depth_multiple = 0.33
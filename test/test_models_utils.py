@@ -1,6 +1,9 @@
 import copy
 import torch
+from torch import nn
 
+from yolort.models import _fuse_module_conv_bn
+from yolort.models.common import Conv
 from yolort.models.transform import YOLOTransform, NestedTensor
 from yolort.models._utils import BalancedPositiveNegativeSampler
 
@@ -33,3 +36,22 @@ def test_yolo_transform():
     # Test annotations after transformation
     torch.testing.assert_allclose(annotations[0]['boxes'], annotations_copy[0]['boxes'], rtol=0., atol=0.)
     torch.testing.assert_allclose(annotations[1]['boxes'], annotations_copy[1]['boxes'], rtol=0., atol=0.)
+
+
+def test_fuse_module_conv_bn():
+    model = nn.Sequential(Conv(3, 16, 3, 2), Conv(16, 32, 1, 1))
+    # Set the batch norm statistics to non-trivial values
+    for m in model.modules():
+        if isinstance(m, nn.BatchNorm2d):
+            m.running_mean.uniform_(-1, 1)
+            m.running_var.uniform_(0.5, 2)
+            m.weight.data.uniform_(0.5, 2)
+            m.bias.data.uniform_(-1, 1)
+    model.eval()
+    x = torch.rand(2, 3, 64, 64)
+    out = model(x)
+
+    _fuse_module_conv_bn(model)
+    assert not any(isinstance(m, nn.BatchNorm2d) for m in model.modules())
+    out_fused = model(x)
+    torch.testing.assert_allclose(out, out_fused, rtol=1e-04, atol=1e-05)
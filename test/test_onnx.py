@@ -3,7 +3,16 @@
 Test for exporting model to ONNX and inference with ONNXRuntime
 """
 import io
+import os
+import hashlib
+import tempfile
 import unittest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import numpy as np
+import cv2
 
 try:
     # This import should be before that of torch if you are using PyTorch lower than 1.5.0
@@ -16,14 +25,23 @@ import torch
 from torchvision.ops._register_onnx_ops import _onnx_opset_version
 
 from yolort.models import yolov5s, yolov5m, yolotr
-from yolort.utils import get_image_from_url, read_image_to_tensor
+from yolort.utils import read_image_to_tensor
+
+_IMG_CACHE = Path(tempfile.gettempdir()) / "yolort_img_cache"
 
 
 @unittest.skipIf(onnxruntime is None, 'ONNX Runtime unavailable')
 class ONNXExporterTester(unittest.TestCase):
+    _session = None
+
     @classmethod
     def setUpClass(cls):
         torch.manual_seed(123)
+        cls._session = requests.Session()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._session.close()
 
     def run_model(self, model, inputs_list, tolerate_small_mismatch=False,
                   do_constant_folding=True, dynamic_axes=None,
@@ -50,6 +68,8 @@ class ONNXExporterTester(unittest.TestCase):
             input_names=input_names,
             output_names=output_names,
         )
+        # build the onnx runtime session once and reuse it for all the inputs
+        ort_session = self.get_ort_session(onnx_io)
         # validate the exported model with onnx runtime
         for test_inputs in inputs_list:
             with torch.no_grad():
@@ -58,9 +78,19 @@ class ONNXExporterTester(unittest.TestCase):
                 test_ouputs = model(*test_inputs)
                 if isinstance(test_ouputs, torch.Tensor):
                     test_ouputs = (test_ouputs,)
-            self.ort_validate(onnx_io, test_inputs, test_ouputs, tolerate_small_mismatch)
+            self.ort_validate(ort_session, test_inputs, test_ouputs, tolerate_small_mismatch)
+
+    @staticmethod
+    def get_ort_session(onnx_io):
+        sess_options = onnxruntime.SessionOptions()
+        sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        sess_options.enable_mem_pattern = True
+        # Prefer the CUDA execution provider when it is available
+        available_providers = onnxruntime.get_available_providers()
+        providers = [p for p in ['CUDAExecutionProvider', 'CPUExecutionProvider'] if p in available_providers]
+        return onnxruntime.InferenceSession(onnx_io.getvalue(), sess_options, providers=providers)
 
-    def ort_validate(self, onnx_io, inputs, outputs, tolerate_small_mismatch=False):
+    def ort_validate(self, ort_session, inputs, outputs, tolerate_small_mismatch=False):
 
         inputs, _ = torch.jit._flatten(inputs)
         outputs, _ = torch.jit._flatten(outputs)
@@ -74,10 +104,16 @@ class ONNXExporterTester(unittest.TestCase):
         inputs = list(map(to_numpy, inputs))
         outputs = list(map(to_numpy, outputs))
 
-        ort_session = onnxruntime.InferenceSession(onnx_io.getvalue())
-        # compute onnxruntime output prediction
-        ort_inputs = dict((ort_session.get_inputs()[i].name, inpt) for i, inpt in enumerate(inputs))
-        ort_outs = ort_session.run(None, ort_inputs)
+        # compute onnxruntime output prediction, the inputs are bound in place to avoid
+        # the copies in run, the outputs are allocated by onnxruntime as the number of
+        # detections is data dependent
+        io_binding = ort_session.io_binding()
+        for ort_input, inpt in zip(ort_session.get_inputs(), inputs):
+            io_binding.bind_cpu_input(ort_input.name, inpt)
+        for ort_output in ort_session.get_outputs():
+            io_binding.bind_output(ort_output.name)
+        ort_session.run_with_iobinding(io_binding)
+        ort_outs = io_binding.copy_outputs_to_cpu()
 
         for i in range(0, len(outputs)):
             try:
@@ -88,13 +124,34 @@ class ONNXExporterTester(unittest.TestCase):
                 else:
                     raise
 
+    def get_image_from_url(self, url):
+        """
+        Download the image and cache it on disk by the hash of the url, so the
+        reruns don't need to download the same image again
+        """
+        cache_file = _IMG_CACHE / f"{hashlib.sha1(url.encode()).hexdigest()}.bin"
+        if not cache_file.is_file():
+            response = self._session.get(url)
+            response.raise_for_status()
+            _IMG_CACHE.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first to make the caching atomic
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_bytes(response.content)
+            tmp_file.replace(cache_file)
+
+        bytes_as_np_array = np.frombuffer(cache_file.read_bytes(), dtype=np.uint8)
+        return cv2.imdecode(bytes_as_np_array, cv2.IMREAD_COLOR)
+
     def get_test_images(self):
-        image_url = "https://github.com/ultralytics/yolov5/raw/master/data/images/bus.jpg"
-        image = get_image_from_url(image_url)
-        image = read_image_to_tensor(image, is_half=False)
+        image_urls = [
+            "https://github.com/ultralytics/yolov5/raw/master/data/images/bus.jpg",
+            "https://github.com/ultralytics/yolov5/raw/master/data/images/zidane.jpg",
+        ]
+        # Fetch the images concurrently
+        with ThreadPoolExecutor(max_workers=len(image_urls)) as executor:
+            image, image2 = executor.map(self.get_image_from_url, image_urls)
 
-        image_url2 = "https://github.com/ultralytics/yolov5/raw/master/data/images/zidane.jpg"
-        image2 = get_image_from_url(image_url2)
+        image = read_image_to_tensor(image, is_half=False)
         image2 = read_image_to_tensor(image2, is_half=False)
 
         images_one = [image]
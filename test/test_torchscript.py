@@ -66,3 +66,17 @@ class TorchScriptTester(unittest.TestCase):
         self.assertTrue(out[0]["scores"].equal(out_script[1][0]["scores"]))
         self.assertTrue(out[0]["labels"].equal(out_script[1][0]["labels"]))
         self.assertTrue(out[0]["boxes"].equal(out_script[1][0]["boxes"]))
+
+    def test_yolov5s_optimize_for_inference(self):
+        model = yolov5s(pretrained=True)
+        model.eval()
+
+        optimized_model = yolov5s(pretrained=True, optimize_for_inference=True)
+
+        x = [torch.rand(3, 416, 320), torch.rand(3, 480, 352)]
+
+        out = model(x)
+        out_optimized = optimized_model(x)
+        self.assertTrue(out[0]["labels"].equal(out_optimized[1][0]["labels"]))
+        torch.testing.assert_allclose(out[0]["scores"], out_optimized[1][0]["scores"], rtol=1e-03, atol=1e-05)
+        torch.testing.assert_allclose(out[0]["boxes"], out_optimized[1][0]["boxes"], rtol=1e-03, atol=1e-03)
@@ -1,4 +1,5 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
 from .data_module import DetectionDataModule, VOCDetectionDataModule, COCODetectionDataModule
 from .coco_eval import COCOEvaluator
+from .prefetcher import CUDAPrefetcher
 from ._helper import contains_any_tensor
@@ -1,6 +1,7 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
 from pathlib import Path, PosixPath
 from zipfile import ZipFile
+from functools import lru_cache
 
 import torch
 from torch import Tensor
@@ -8,6 +9,7 @@ from torch import Tensor
 from typing import Type, Any
 
 from .coco import COCODetection
+from .prefetcher import CUDAPrefetcher
 from .transforms import collate_fn, default_train_transforms, default_val_transforms
 
 import logging
@@ -49,8 +51,20 @@ def prepare_coco128(
         data_path (PosixPath): root path of coco128 dataset.
         dirname (str): the directory name of coco128 dataset. Default: 'coco128'.
     """
+    _prepare_coco128(Path(data_path).resolve(), dirname)
+
+
+@lru_cache(maxsize=4)
+def _prepare_coco128(data_path: PosixPath, dirname: str) -> None:
     logger = logging.getLogger(__name__)
 
+    coco128_path = data_path / dirname
+    # Marks a dataset directory that has been extracted, or that already existed and is
+    # trusted as is, the contents of the directory aren't checked again once it's written
+    prepared_file = coco128_path / 'annotations' / '.prepared.ok'
+    if prepared_file.is_file():
+        return
+
     if not data_path.is_dir():
         logger.info(f'Create a new directory: {data_path}')
         data_path.mkdir(parents=True, exist_ok=True)
@@ -61,12 +75,13 @@ def prepare_coco128(
         logger.info(f'Downloading coco128 datasets form {coco128_url}')
         torch.hub.download_url_to_file(coco128_url, zip_path, hash_prefix='a67d2887')
 
-    coco128_path = data_path / dirname
     if not coco128_path.is_dir():
         logger.info(f'Unzipping dataset to {coco128_path}')
         with ZipFile(zip_path, 'r') as zip_obj:
             zip_obj.extractall(data_path)
 
+    prepared_file.touch()
+
 
 def get_dataset(data_root: str, mode: str = 'val'):
     # Acquire the images and labels from the coco128 dataset
@@ -89,7 +104,16 @@ def get_dataset(data_root: str, mode: str = 'val'):
     return dataset
 
 
-def get_dataloader(data_root: str, mode: str = 'val', batch_size: int = 4):
+def get_dataloader(
+    data_root: str,
+    mode: str = 'val',
+    batch_size: int = 4,
+    num_workers: int = 0,
+    pin_memory: bool = False,
+    persistent_workers: bool = False,
+    prefetch_factor: int = 2,
+    prefetch: bool = False,
+):
     # Prepare the datasets for training
     # Acquire the images and labels from the coco128 dataset
     dataset = get_dataset(data_root=data_root, mode=mode)
@@ -97,13 +121,32 @@ def get_dataloader(data_root: str, mode: str = 'val', batch_size: int = 4):
     # We adopt the sequential sampler in order to repeat the experiment
     sampler = torch.utils.data.SequentialSampler(dataset)
 
+    # The prefetcher copies the batches asynchronously, which requires the page-locked memory
+    pin_memory = pin_memory or prefetch
+
+    kwargs = {}
+    # Only valid when loading with worker processes
+    if num_workers > 0:
+        kwargs['persistent_workers'] = persistent_workers
+        kwargs['prefetch_factor'] = prefetch_factor
+
     loader = torch.utils.data.DataLoader(
         dataset,
         batch_size,
         sampler=sampler,
         drop_last=False,
         collate_fn=collate_fn,
-        num_workers=0,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        **kwargs,
     )
 
+    # Overlap the host to device copy of the next batch with the current step
+    if prefetch:
+        if torch.cuda.is_available():
+            loader = CUDAPrefetcher(loader)
+        else:
+            logger = logging.getLogger(__name__)
+            logger.warning("CUDA is unavailable, the batches won't be prefetched to the device.")
+
     return loader
@@ -3,17 +3,22 @@
 COCO dataset which returns image_id for evaluation.
 Mostly copy-paste from https://github.com/pytorch/vision/blob/13b35ff/references/detection/coco_utils.py
 """
+import io
+import contextlib
+
 import torch
 import torchvision
 try:
     from pycocotools import mask as coco_mask
+    from pycocotools.coco import COCO
 except ImportError:
-    coco_mask = None
+    coco_mask, COCO = None, None
 
 
 class COCODetection(torchvision.datasets.CocoDetection):
     def __init__(self, img_folder, ann_file, transforms, return_masks=False):
         super().__init__(img_folder, ann_file)
+        self._ann_file = str(ann_file)
         self._transforms = transforms
 
         json_category_id_to_contiguous_id = {
@@ -30,6 +35,18 @@ class COCODetection(torchvision.datasets.CocoDetection):
             img, target = self._transforms(img, target)
         return img, target
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The COCO api is re-constructed from the annotation file in the DataLoader workers
+        # instead of being pickled
+        state.pop('coco', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.coco = COCO(self._ann_file)
+
 
 class ConvertCocoPolysToMask:
     def __init__(self, json_category_id_maps, return_masks=False):
@@ -9,6 +9,7 @@ from tabulate import tabulate
 
 import numpy as np
 
+import torch
 from torchvision.ops import box_convert
 
 from torchmetrics import Metric
@@ -41,6 +42,7 @@ class COCOEvaluator(Metric):
         dist_sync_on_step: bool = False,
         process_group: Optional[Any] = None,
         dist_sync_fn: Callable = None,
+        deepcopy_gt: bool = False,
     ):
         """
         Args:
@@ -49,6 +51,10 @@ class COCOEvaluator(Metric):
                 - PosixPath: a json file in COCO's result format, and is wrapped with Path.
                 - COCO: COCO api
             iou_type (str): iou type to compute.
+            deepcopy_gt (bool): whether to deep copy the COCO api passed in. The evaluation only
+                reads the index of the ground truth, with the exception that pycocotools sets the
+                ``ignore`` field of the ground truth annotations, so the COCO api is shared with
+                the caller by default. Default: False.
         """
         super().__init__(
             compute_on_step=compute_on_step,
@@ -57,26 +63,53 @@ class COCOEvaluator(Metric):
             dist_sync_fn=dist_sync_fn,
         )
         self._logger = logging.getLogger(__name__)
+        # used to re-construct the COCO api when unpickling
+        self._ann_file = None
         if isinstance(coco_gt, str) or isinstance(coco_gt, PosixPath):
+            self._ann_file = str(coco_gt)
             with contextlib.redirect_stdout(io.StringIO()):
                 coco_gt = COCO(coco_gt)
         elif isinstance(coco_gt, COCO):
-            coco_gt = copy.deepcopy(coco_gt)
+            if deepcopy_gt:
+                coco_gt = copy.deepcopy(coco_gt)
         else:
             raise NotImplementedError(f"Currently not support type {type(coco_gt)}")
 
         self.coco_gt = coco_gt
         self.contiguous_to_json_category = coco_gt.getCatIds()
+        # lookup table to remap the contiguous labels to json category ids in one shot
+        self._cat_lut = np.asarray(self.contiguous_to_json_category, dtype=np.int64)
 
         self.iou_type = iou_type
         self.coco_eval = COCOeval(coco_gt, iouType=iou_type)
 
         self.img_ids = []
+        # the per image evaluation results of each update, as ndarray of shape
+        # (num_categories, num_area_ranges, num_images), concatenated only once in compute
         self.eval_imgs = []
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The COCO api is re-constructed from the annotation file instead of being pickled
+        if self._ann_file is not None:
+            state = state.copy()
+            for key in ('coco_gt', 'coco_dt', 'coco_eval'):
+                state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if 'coco_gt' not in self.__dict__:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.coco_gt = COCO(self._ann_file)
+            self.coco_eval = COCOeval(self.coco_gt, iouType=self.iou_type)
+
     def update(self, preds, targets):
-        records = {target['image_id'].item(): prediction for target, prediction in zip(targets, preds)}
-        img_ids = list(np.unique(list(records.keys())))
+        # gather the image ids with only one device to host synchronization
+        image_ids = torch.cat([target['image_id'].detach().reshape(-1) for target in targets])
+        image_ids = image_ids.cpu().numpy().astype(np.int64, copy=False)
+        records = dict(zip(image_ids.tolist(), preds))
+        img_ids = np.unique(image_ids).tolist()
         self.img_ids.extend(img_ids)
 
         results = self.prepare(records, self.iou_type)
@@ -88,7 +121,7 @@ class COCOEvaluator(Metric):
         coco_eval = self.coco_eval
 
         coco_eval.cocoDt = self.coco_dt
-        coco_eval.params.imgIds = list(img_ids)
+        coco_eval.params.imgIds = img_ids
         img_ids, eval_imgs = evaluate(coco_eval)
 
         self.eval_imgs.append(eval_imgs)
@@ -184,27 +217,29 @@ class COCOEvaluator(Metric):
             raise ValueError(f"Unknown iou type {iou_type}, fell free to report on GitHub issues")
 
     def prepare_for_coco_detection(self, predictions):
-        coco_results = []
-        for original_id, prediction in predictions.items():
-            if len(prediction) == 0:
-                continue
-
-            boxes = prediction["boxes"]
-            boxes = box_convert(boxes, in_fmt='xyxy', out_fmt='xywh').tolist()
-            scores = prediction["scores"].tolist()
-            labels = prediction["labels"].tolist()
-
-            coco_results.extend(
-                [
-                    {
-                        "image_id": original_id,
-                        "category_id": self.contiguous_to_json_category[labels[k]],
-                        "bbox": box,
-                        "score": scores[k],
-                    }
-                    for k, box in enumerate(boxes)
-                ]
-            )
+        predictions = {k: v for k, v in predictions.items() if len(v) > 0}
+        if len(predictions) == 0:
+            return []
+
+        # batch all the predictions in one go to avoid the per detection conversion
+        boxes = torch.cat([prediction["boxes"] for prediction in predictions.values()])
+        boxes = box_convert(boxes, in_fmt='xyxy', out_fmt='xywh').tolist()
+        scores = torch.cat([prediction["scores"] for prediction in predictions.values()]).tolist()
+        labels = torch.cat([prediction["labels"] for prediction in predictions.values()])
+        category_ids = np.take(self._cat_lut, labels.cpu().numpy()).tolist()
+
+        num_dets = [len(prediction["scores"]) for prediction in predictions.values()]
+        image_ids = np.repeat(list(predictions.keys()), num_dets).tolist()
+
+        coco_results = [
+            {
+                "image_id": image_id,
+                "category_id": category_id,
+                "bbox": box,
+                "score": score,
+            }
+            for image_id, category_id, box, score in zip(image_ids, category_ids, boxes, scores)
+        ]
         return coco_results
 
 
@@ -213,19 +248,14 @@ def merge(img_ids, eval_imgs):
     Gather data, copy from
     https://github.com/pytorch/vision/blob/edfd5a7/references/detection/coco_eval.py#L163-L182
     """
-    all_img_ids = all_gather(img_ids)
-    all_eval_imgs = all_gather(eval_imgs)
-
-    merged_img_ids = []
-    for p in all_img_ids:
-        merged_img_ids.extend(p)
+    # Gather the image ids and evaluation results of all ranks in one collective
+    all_data = all_gather((img_ids, eval_imgs))
 
-    merged_eval_imgs = []
-    for p in all_eval_imgs:
-        merged_eval_imgs.append(p)
-
-    merged_img_ids = np.array(merged_img_ids)
-    merged_eval_imgs = np.concatenate(merged_eval_imgs, 2)
+    merged_img_ids = np.array([img_id for p in all_data for img_id in p[0]])
+    if len(all_data) == 1:
+        merged_eval_imgs = all_data[0][1]
+    else:
+        merged_eval_imgs = np.concatenate([p[1] for p in all_data], 2)
 
     # keep only unique (and in sorted order) images
     merged_img_ids, idx = np.unique(merged_img_ids, return_index=True)
@@ -287,14 +317,14 @@ def evaluate(self):
 
     evaluateImg = self.evaluateImg
     maxDet = p.maxDets[-1]
-    evalImgs = [
-        evaluateImg(imgId, catId, areaRng, maxDet)
-        for catId in catIds
-        for areaRng in p.areaRng
-        for imgId in p.imgIds
-    ]
-    # this is NOT in the pycocotools code, but could be done outside
-    evalImgs = np.asarray(evalImgs).reshape(len(catIds), len(p.areaRng), len(p.imgIds))
+    # this is NOT in the pycocotools code, the results are written directly into
+    # an array of shape (num_categories, num_area_ranges, num_images)
+    evalImgs = np.empty((len(catIds), len(p.areaRng), len(p.imgIds)), dtype=object)
+    for c, catId in enumerate(catIds):
+        for a, areaRng in enumerate(p.areaRng):
+            for i, imgId in enumerate(p.imgIds):
+                evalImgs[c, a, i] = evaluateImg(imgId, catId, areaRng, maxDet)
+
     self._paramsEval = copy.deepcopy(self.params)
     # toc = time.time()
     return p.imgIds, evalImgs
@@ -6,7 +6,7 @@ from torch.utils.data.dataset import Dataset
 
 from pytorch_lightning import LightningDataModule
 
-from typing import Callable, List, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 
 from .transforms import collate_fn, default_train_transforms, default_val_transforms
 from .voc import VOCDetection
@@ -24,6 +24,9 @@ class DetectionDataModule(LightningDataModule):
         test_dataset: Optional[Dataset] = None,
         batch_size: int = 16,
         num_workers: int = 0,
+        pin_memory: bool = True,
+        persistent_workers: bool = True,
+        prefetch_factor: int = 4,
         *args: Any,
         **kwargs: Any,
     ) -> None:
@@ -35,6 +38,17 @@ class DetectionDataModule(LightningDataModule):
 
         self.batch_size = batch_size
         self.num_workers = num_workers
+        self.pin_memory = pin_memory
+        self.persistent_workers = persistent_workers
+        self.prefetch_factor = prefetch_factor
+
+    def _loader_kwargs(self) -> Dict[str, Any]:
+        kwargs = {'num_workers': self.num_workers, 'pin_memory': self.pin_memory}
+        # Only valid when loading with worker processes
+        if self.num_workers > 0:
+            kwargs['persistent_workers'] = self.persistent_workers
+            kwargs['prefetch_factor'] = self.prefetch_factor
+        return kwargs
 
     def train_dataloader(self) -> None:
         """
@@ -54,7 +68,7 @@ class DetectionDataModule(LightningDataModule):
             self._train_dataset,
             batch_sampler=batch_sampler,
             collate_fn=collate_fn,
-            num_workers=self.num_workers,
+            **self._loader_kwargs(),
         )
 
         return loader
@@ -75,7 +89,7 @@ class DetectionDataModule(LightningDataModule):
             sampler=sampler,
             drop_last=False,
             collate_fn=collate_fn,
-            num_workers=self.num_workers,
+            **self._loader_kwargs(),
         )
 
         return loader
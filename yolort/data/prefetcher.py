@@ -0,0 +1,71 @@
+# Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
+import torch
+from torch.utils.data import DataLoader
+
+from typing import Optional
+
+
+class CUDAPrefetcher:
+    """
+    Wraps a detection DataLoader and copies the next batch to the device on a side CUDA stream,
+    so that the host to device copy overlaps with the compute of the current step. Modified from
+    https://github.com/NVIDIA/apex/blob/master/examples/imagenet/main_amp.py
+
+    The wrapped DataLoader should be built with ``pin_memory=True``, otherwise the copies
+    can not be asynchronous.
+
+    Args:
+        loader (DataLoader): the DataLoader to wrap, its batches are ``(images, targets)``
+        device (torch.device, optional): the CUDA device to copy the batches to. Default: current device
+    """
+    def __init__(self, loader: DataLoader, device: Optional[torch.device] = None):
+        self.loader = loader
+        self.device = torch.device('cuda') if device is None else device
+        self.stream = torch.cuda.Stream(device=self.device)
+
+        self._iter = None
+        self._next_batch = None
+
+    @property
+    def dataset(self):
+        return self.loader.dataset
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        self._iter = iter(self.loader)
+        self._preload()
+        return self
+
+    def _preload(self):
+        try:
+            images, targets = next(self._iter)
+        except StopIteration:
+            self._next_batch = None
+            return
+
+        with torch.cuda.stream(self.stream):
+            images = [img.to(self.device, non_blocking=True) for img in images]
+            targets = [{k: v.to(self.device, non_blocking=True) for k, v in t.items()} for t in targets]
+
+        self._next_batch = (images, targets)
+
+    def __next__(self):
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(self.stream)
+
+        batch = self._next_batch
+        if batch is None:
+            raise StopIteration
+
+        # The tensors are allocated on the side stream but consumed on the current stream
+        images, targets = batch
+        for img in images:
+            img.record_stream(current_stream)
+        for target in targets:
+            for v in target.values():
+                v.record_stream(current_stream)
+
+        self._preload()
+        return batch
@@ -1,5 +1,7 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
+import torch
 from torch import nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 
 from .common import Conv
 from .yolo_module import YOLOModule
@@ -9,13 +11,22 @@ from ..utils.activations import Hardswish, SiLU
 from typing import Any
 
 
-def yolov5s(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwargs: Any):
+def yolov5s(
+    upstream_version: str = 'r4.0',
+    export_friendly: bool = False,
+    optimize_for_inference: bool = False,
+    **kwargs: Any,
+):
     """
     Args:
         upstream_version (str): model released by the upstream YOLOv5. Possible values
             are 'r3.1' and 'r4.0'. Default: 'r4.0'.
-        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode.
-            Default: False.
+        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode, the
+            batch norms are fused into the convolutions when ``pretrained`` is True, and
+            the model is put in eval mode. Default: False.
+        optimize_for_inference (bool): Deciding whether to return a scripted, frozen and
+            inference optimized model, the returned model is in eval mode and doesn't support
+            training. Default: False.
     """
     if upstream_version == 'r3.1':
         model = YOLOModule(arch="yolov5_darknet_pan_s_r31", **kwargs)
@@ -25,18 +36,30 @@ def yolov5s(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwa
         raise NotImplementedError("Currently only supports r3.1 and r4.0 versions")
 
     if export_friendly:
-        _export_module_friendly(model)
+        _export_module_friendly(model, fuse_conv_bn=kwargs.get('pretrained', False))
+
+    if optimize_for_inference:
+        model = _optimize_module_for_inference(model)
 
     return model
 
 
-def yolov5m(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwargs: Any):
+def yolov5m(
+    upstream_version: str = 'r4.0',
+    export_friendly: bool = False,
+    optimize_for_inference: bool = False,
+    **kwargs: Any,
+):
     """
     Args:
         upstream_version (str): model released by the upstream YOLOv5. Possible values
             are 'r3.1' and 'r4.0'. Default: 'r4.0'.
-        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode.
-            Default: False.
+        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode, the
+            batch norms are fused into the convolutions when ``pretrained`` is True, and
+            the model is put in eval mode. Default: False.
+        optimize_for_inference (bool): Deciding whether to return a scripted, frozen and
+            inference optimized model, the returned model is in eval mode and doesn't support
+            training. Default: False.
     """
     if upstream_version == 'r3.1':
         model = YOLOModule(arch="yolov5_darknet_pan_m_r31", **kwargs)
@@ -46,18 +69,30 @@ def yolov5m(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwa
         raise NotImplementedError("Currently only supports r3.1 and r4.0 versions")
 
     if export_friendly:
-        _export_module_friendly(model)
+        _export_module_friendly(model, fuse_conv_bn=kwargs.get('pretrained', False))
+
+    if optimize_for_inference:
+        model = _optimize_module_for_inference(model)
 
     return model
 
 
-def yolov5l(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwargs: Any):
+def yolov5l(
+    upstream_version: str = 'r4.0',
+    export_friendly: bool = False,
+    optimize_for_inference: bool = False,
+    **kwargs: Any,
+):
     """
     Args:
         upstream_version (str): model released by the upstream YOLOv5. Possible values
             are 'r3.1' and 'r4.0'. Default: 'r4.0'.
-        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode.
-            Default: False.
+        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode, the
+            batch norms are fused into the convolutions when ``pretrained`` is True, and
+            the model is put in eval mode. Default: False.
+        optimize_for_inference (bool): Deciding whether to return a scripted, frozen and
+            inference optimized model, the returned model is in eval mode and doesn't support
+            training. Default: False.
     """
     if upstream_version == 'r3.1':
         model = YOLOModule(arch="yolov5_darknet_pan_l_r31", **kwargs)
@@ -67,18 +102,30 @@ def yolov5l(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwa
         raise NotImplementedError("Currently only supports r3.1 and r4.0 versions")
 
     if export_friendly:
-        _export_module_friendly(model)
+        _export_module_friendly(model, fuse_conv_bn=kwargs.get('pretrained', False))
+
+    if optimize_for_inference:
+        model = _optimize_module_for_inference(model)
 
     return model
 
 
-def yolotr(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwargs: Any):
+def yolotr(
+    upstream_version: str = 'r4.0',
+    export_friendly: bool = False,
+    optimize_for_inference: bool = False,
+    **kwargs: Any,
+):
     """
     Args:
         upstream_version (str): model released by the upstream YOLOv5. Possible values
             are 'r3.1' and 'r4.0'. Default: 'r4.0'.
-        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode.
-            Default: False.
+        export_friendly (bool): Deciding whether to use (ONNX/TVM) export friendly mode, the
+            batch norms are fused into the convolutions when ``pretrained`` is True, and
+            the model is put in eval mode. Default: False.
+        optimize_for_inference (bool): Deciding whether to return a scripted, frozen and
+            inference optimized model, the returned model is in eval mode and doesn't support
+            training. Default: False.
     """
     if upstream_version == 'r4.0':
         model = YOLOModule(arch="yolov5_darknet_tan_s_r40", **kwargs)
@@ -86,12 +133,20 @@ def yolotr(upstream_version: str = 'r4.0', export_friendly: bool = False, **kwar
         raise NotImplementedError("Currently only supports r4.0 versions")
 
     if export_friendly:
-        _export_module_friendly(model)
+        _export_module_friendly(model, fuse_conv_bn=kwargs.get('pretrained', False))
+
+    if optimize_for_inference:
+        model = _optimize_module_for_inference(model)
 
     return model
 
 
-def _export_module_friendly(model):
+def _export_module_friendly(model, fuse_conv_bn=False):
+    if fuse_conv_bn:
+        # The weights are stable, fuse the batch norms in eval mode
+        model.eval()
+        _fuse_module_conv_bn(model)
+
     for m in model.modules():
         m._non_persistent_buffers_set = set()  # pytorch 1.6.0 compatibility
         if isinstance(m, Conv):
@@ -99,3 +154,20 @@ def _export_module_friendly(model):
                 m.act = Hardswish()  # assign activation
             if isinstance(m.act, nn.SiLU):
                 m.act = SiLU()
+
+
+def _optimize_module_for_inference(model):
+    # Only optimize the model in eval mode, the backward isn't supported after freezing
+    model = torch.jit.script(model.eval())
+    if hasattr(torch.jit, 'freeze'):  # pytorch 1.8.0 compatibility
+        model = torch.jit.freeze(model)
+    if hasattr(torch.jit, 'optimize_for_inference'):  # pytorch 1.9.0 compatibility
+        model = torch.jit.optimize_for_inference(model)
+    return model
+
+
+def _fuse_module_conv_bn(model):
+    for m in model.modules():
+        if isinstance(m, Conv) and isinstance(m.bn, nn.BatchNorm2d):
+            m.conv = fuse_conv_bn_eval(m.conv, m.bn)
+            m.bn = nn.Identity()
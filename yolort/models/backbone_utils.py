@@ -1,35 +1,94 @@
 # Copyright (c) 2021, Zhiqiang Wang. All Rights Reserved.
-from torch import nn
-from torchvision.models._utils import IntermediateLayerGetter
+import inspect
+from collections import OrderedDict
+
+import torch
+from torch import nn, Tensor
+from torch.utils.checkpoint import checkpoint
 
 from . import darknet
 from .path_aggregation_network import PathAggregationNetwork
 
 from typing import List, Optional
 
+# pytorch 1.11.0 compatibility, the reentrant variant doesn't compute the gradients
+# of the parameters when the input of the checkpointed segment doesn't require grad
+_checkpoint_kwargs = {'use_reentrant': False} if 'use_reentrant' in inspect.signature(checkpoint).parameters else {}
+
+
+class IntermediateLayerSequential(nn.Sequential):
+    """
+    Module wrapper that returns intermediate layers from a sequential model.
+
+    It has the same module state as torchvision.models._utils.IntermediateLayerGetter, the
+    children after the last returned layer are dropped and the others keep their names. But
+    the feature maps are returned as a list ordered by the layer indices, so there is no dict
+    construction and string keys lookup in the forward, and TorchScript can unroll the loop.
+
+    Args:
+        model (nn.Sequential): model on which we will extract the features
+        returned_layers (List[int]): the indices of the modules for which the activations
+            will be returned
+    """
+    def __init__(self, model: nn.Sequential, returned_layers: List[int]):
+        layers = OrderedDict()
+        for name, module in model.named_children():
+            if int(name) > max(returned_layers):
+                break
+            layers[name] = module
+
+        super().__init__(layers)
+        self.returned_layers = sorted(returned_layers)
+
+    def forward(self, x: Tensor) -> List[Tensor]:
+        out: List[Tensor] = []
+        i = 0
+        for module in self:
+            x = module(x)
+            if i in self.returned_layers:
+                out.append(x)
+            i += 1
+        return out
+
 
 class BackboneWithPAN(nn.Module):
     """
     Adds a PAN on top of a model.
-    Internally, it uses torchvision.models._utils.IntermediateLayerGetter to
-    extract a submodel that returns the feature maps specified in return_layers.
-    The same limitations of IntermediatLayerGetter apply here.
+    Internally, it uses IntermediateLayerSequential to extract a submodel that
+    returns the feature maps specified in return_layers.
     Args:
         backbone (nn.Module)
         return_layers (Dict[name, new_name]): a dict containing the names
             of the modules for which the activations will be returned as
-            the key of the dict, and the value of the dict is the name
-            of the returned activation (which the user can specify).
+            the key of the dict, the feature maps are returned in the order
+            of the modules.
         in_channels_list (List[int]): number of channels for each feature map
-            that is returned, in the order they are present in the OrderedDict
+            that is returned, in the order they are present in the backbone
         version (str): ultralytics release version: r3.1 or r4.0
+        gradient_checkpointing (bool): If True, the body is split into segments ending at each of
+            the return_layers, and only the outputs of the segments are stored during training, the
+            other activations are re-computed in the backward. Default: False
+        channels_last (bool): If True, the inputs are converted to the channels last memory format,
+            the weights should be converted by the caller as well. Default: False
     Attributes:
         out_channels (int): the number of channels in the PAN
     """
-    def __init__(self, backbone, return_layers, in_channels_list, depth_multiple, version):
+    def __init__(self, backbone, return_layers, in_channels_list, depth_multiple, version,
+                 gradient_checkpointing=False, channels_last=False):
         super().__init__()
 
-        self.body = IntermediateLayerGetter(backbone, return_layers=return_layers)
+        self.body = IntermediateLayerSequential(backbone, [int(k) for k in return_layers])
+        self.gradient_checkpointing = gradient_checkpointing
+        self.channels_last = channels_last
+        # The indices of the modules in each checkpointed segment
+        self._segments: List[List[int]] = []
+        segment: List[int] = []
+        for i in range(len(self.body)):
+            segment.append(i)
+            if i in self.body.returned_layers:
+                self._segments.append(segment)
+                segment = []
+
         self.pan = PathAggregationNetwork(
             in_channels_list,
             depth_multiple,
@@ -37,11 +96,66 @@ class BackboneWithPAN(nn.Module):
         )
         self.out_channels = in_channels_list
 
-    def forward(self, x):
-        x = self.body(x)
+    def forward(self, x: Tensor) -> List[Tensor]:
+        if self.channels_last:
+            # Use the NHWC layout to route the convolutions to the channels last kernels
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.gradient_checkpointing and self.training:
+            x = self._checkpoint_body(x)
+        else:
+            x = self.body(x)
         x = self.pan(x)
         return x
 
+    @torch.jit.unused
+    def _checkpoint_body(self, x: Tensor) -> List[Tensor]:
+        """
+        This is equivalent to self.body(x), but trades compute for the activation memory
+        """
+        out = []
+        for segment in self._segments:
+            run_segment = _run_sequential([self.body[i] for i in segment])
+            if _checkpoint_kwargs or x.requires_grad:
+                x = checkpoint(run_segment, x, **_checkpoint_kwargs)
+            else:
+                x = run_segment(x)
+            out.append(x)
+        return out
+
+
+def _run_sequential(modules: List[nn.Module]):
+    """
+    Runs the modules in order, the checkpoint re-computes it in the backward with the
+    modules still in training mode. The buffers of the batch norms are restored after
+    the re-computation so that the running statistics are only updated once per step.
+    The non-reentrant checkpoint may stop the re-computation early by raising from the
+    saved tensor hooks, so the buffers are restored in a finally block.
+    """
+    batch_norms = [m for module in modules for m in module.modules() if isinstance(m, nn.BatchNorm2d)]
+    num_calls = 0
+
+    def forward(x: Tensor) -> Tensor:
+        nonlocal num_calls
+        is_recomputing = num_calls > 0
+        num_calls += 1
+
+        if not is_recomputing:
+            for module in modules:
+                x = module(x)
+            return x
+
+        states = [[b.clone() for b in bn.buffers()] for bn in batch_norms]
+        try:
+            for module in modules:
+                x = module(x)
+        finally:
+            for bn, state in zip(batch_norms, states):
+                for b, saved in zip(bn.buffers(), state):
+                    b.copy_(saved)
+        return x
+
+    return forward
+
 
 def darknet_pan_backbone(
     backbone_name: str,
@@ -50,6 +164,8 @@ def darknet_pan_backbone(
     pretrained: Optional[bool] = False,
     returned_layers: Optional[List[int]] = None,
     version: str = 'r4.0',
+    gradient_checkpointing: bool = False,
+    channels_last: bool = False,
 ):
     """
     Constructs a specified DarkNet backbone with PAN on top. Freezes the specified number of
@@ -63,11 +179,11 @@ def darknet_pan_backbone(
         >>> x = torch.rand(1, 3, 64, 64)
         >>> # compute the output
         >>> output = backbone(x)
-        >>> print([(k, v.shape) for k, v in output.items()])
+        >>> print([v.shape for v in output])
         >>> # returns
-        >>>   [('0', torch.Size([1, 128, 8, 8])),
-        >>>    ('1', torch.Size([1, 256, 4, 4])),
-        >>>    ('2', torch.Size([1, 512, 2, 2]))]
+        >>>   [torch.Size([1, 128, 8, 8]),
+        >>>    torch.Size([1, 256, 4, 4]),
+        >>>    torch.Size([1, 512, 2, 2])]
 
     Args:
         backbone_name (string): darknet architecture. Possible values are 'DarkNet', 'darknet_s_r3_1',
@@ -78,6 +194,10 @@ def darknet_pan_backbone(
         trainable_layers (int): number of trainable (not frozen) darknet layers starting from final block.
             Valid values are between 0 and 5, with 5 meaning all backbone layers are trainable.
         version (str): ultralytics release version: r3.1 or r4.0
+        gradient_checkpointing (bool): If True, checkpoints the backbone segments during training
+            to reduce the activation memory. Default: False
+        channels_last (bool): If True, uses the channels last memory format for the weights and
+            the inputs, it is only faster with the CUDA kernels of the recent PyTorch. Default: False
     """
     backbone = darknet.__dict__[backbone_name](pretrained=pretrained).features
 
@@ -88,4 +208,9 @@ def darknet_pan_backbone(
 
     in_channels_list = [int(gw * width_multiple) for gw in [256, 512, 1024]]
 
-    return BackboneWithPAN(backbone, return_layers, in_channels_list, depth_multiple, version)
+    backbone = BackboneWithPAN(backbone, return_layers, in_channels_list, depth_multiple, version,
+                               gradient_checkpointing=gradient_checkpointing, channels_last=channels_last)
+    if channels_last:
+        backbone = backbone.to(memory_format=torch.channels_last)
+
+    return backbone
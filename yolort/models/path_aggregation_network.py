@@ -4,7 +4,7 @@ from torch import nn, Tensor
 
 from .common import Conv, BottleneckCSP, C3
 
-from typing import Callable, List, Dict, Optional
+from typing import Callable, List, Optional
 
 
 class PathAggregationNetwork(nn.Module):
@@ -15,7 +15,7 @@ class PathAggregationNetwork(nn.Module):
     The feature maps are currently supposed to be in increasing depth
     order.
 
-    The input to the model is expected to be an OrderedDict[Tensor], containing
+    The input to the model is expected to be a List[Tensor], containing
     the feature maps on top of which the PAN will be added.
 
     Args:
@@ -28,17 +28,18 @@ class PathAggregationNetwork(nn.Module):
 
         >>> m = PathAggregationNetwork()
         >>> # get some dummy data
-        >>> x = OrderedDict()
-        >>> x['feat0'] = torch.rand(1, 128, 52, 44)
-        >>> x['feat2'] = torch.rand(1, 256, 26, 22)
-        >>> x['feat3'] = torch.rand(1, 512, 13, 11)
+        >>> x = [
+        >>>     torch.rand(1, 128, 52, 44),
+        >>>     torch.rand(1, 256, 26, 22),
+        >>>     torch.rand(1, 512, 13, 11),
+        >>> ]
         >>> # compute the PAN on top of x
         >>> output = m(x)
-        >>> print([(k, v.shape) for k, v in output.items()])
+        >>> print([v.shape for v in output])
         >>> # returns
-        >>>   [('feat0', torch.Size([1, 128, 52, 44])),
-        >>>    ('feat2', torch.Size([1, 256, 26, 22])),
-        >>>    ('feat3', torch.Size([1, 512, 13, 11]))]
+        >>>   [torch.Size([1, 128, 52, 44]),
+        >>>    torch.Size([1, 256, 26, 22]),
+        >>>    torch.Size([1, 512, 13, 11])]
 
     """
     def __init__(
@@ -76,6 +77,13 @@ class PathAggregationNetwork(nn.Module):
         ]
         self.layer_blocks = nn.ModuleList(layer_blocks)
 
+        # The index of the backbone feature map fused at the end of each descending stage
+        self.inner_laterals: List[int] = [1, 0]
+        # Each descending stage is a (block, lateral conv, upsample), and each ascending stage
+        # is a downsample conv followed by a block, except that the first one is only a block
+        assert len(self.inner_blocks) == 3 * len(self.inner_laterals)
+        assert len(self.layer_blocks) == 2 * len(self.inner_laterals) + 1
+
         for m in self.modules():
             if isinstance(m, nn.Conv2d):
                 pass  # nn.init.kaiming_normal_(m.weight, mode='fan_out', nonlinearity='relu')
@@ -85,76 +93,49 @@ class PathAggregationNetwork(nn.Module):
             elif isinstance(m, (nn.Hardswish, nn.LeakyReLU, nn.ReLU, nn.ReLU6)):
                 m.inplace = True
 
-    def get_result_from_inner_blocks(self, x: Tensor, idx: int) -> Tensor:
-        """
-        This is equivalent to self.inner_blocks[idx](x),
-        but torchscript doesn't support this yet
-        """
-        num_blocks = len(self.inner_blocks)
-        if idx < 0:
-            idx += num_blocks
-        i = 0
-        out = x
-        for module in self.inner_blocks:
-            if i == idx:
-                out = module(x)
-            i += 1
-        return out
-
-    def get_result_from_layer_blocks(self, x: Tensor, idx: int) -> Tensor:
-        """
-        This is equivalent to self.layer_blocks[idx](x),
-        but torchscript doesn't support this yet
-        """
-        num_blocks = len(self.layer_blocks)
-        if idx < 0:
-            idx += num_blocks
-        i = 0
-        out = x
-        for module in self.layer_blocks:
-            if i == idx:
-                out = module(x)
-            i += 1
-        return out
-
-    def forward(self, x: Dict[str, Tensor]) -> List[Tensor]:
+    def forward(self, x: List[Tensor]) -> List[Tensor]:
         """
         Computes the PAN for a set of feature maps.
 
         Args:
-            x (OrderedDict[Tensor]): feature maps for each feature level.
+            x (List[Tensor]): feature maps for each feature level.
 
         Returns:
-            results (OrderedDict[Tensor]): feature maps after PAN layers.
+            results (List[Tensor]): feature maps after PAN layers.
                 They are ordered from highest resolution first.
         """
-        # unpack OrderedDict into two lists for easier handling
-        x = list(x.values())
-
         # Descending the feature pyramid
-        inners = []
-        last_inner = self.get_result_from_inner_blocks(x[2], 0)
-        last_inner = self.get_result_from_inner_blocks(last_inner, 1)
-        inners.append(last_inner)
-        last_inner = self.get_result_from_inner_blocks(last_inner, 2)
-        last_inner = torch.cat([last_inner, x[1]], dim=1)
-        last_inner = self.get_result_from_inner_blocks(last_inner, 3)
-        last_inner = self.get_result_from_inner_blocks(last_inner, 4)
-        inners.insert(0, last_inner)
-        last_inner = self.get_result_from_inner_blocks(last_inner, 5)
-        last_inner = torch.cat([last_inner, x[0]], dim=1)
+        inners: List[Tensor] = []
+        last_inner = x[2]
+        stage = 0
+        step = 0
+        for module in self.inner_blocks:
+            last_inner = module(last_inner)
+            if step == 1:
+                # The output of the lateral conv is fused again when ascending the pyramid
+                inners.insert(0, last_inner)
+            if step == 2:
+                # The upsampled feature map is fused with the lateral feature map of the stage
+                last_inner = torch.cat([last_inner, x[self.inner_laterals[stage]]], dim=1)
+                stage += 1
+                step = 0
+            else:
+                step += 1
         inners.insert(0, last_inner)
 
         # Ascending the feature pyramid
-        results = []
-        last_inner = self.get_result_from_layer_blocks(inners[0], 0)
-        results.append(last_inner)
-
-        for idx in range(len(inners) - 1):
-            last_inner = self.get_result_from_layer_blocks(last_inner, 2 * idx + 1)
-            last_inner = torch.cat([last_inner, inners[idx + 1]], dim=1)
-            last_inner = self.get_result_from_layer_blocks(last_inner, 2 * idx + 2)
-            results.append(last_inner)
+        results: List[Tensor] = []
+        last_inner = inners[0]
+        stage = 0
+        is_downsample = False
+        for module in self.layer_blocks:
+            last_inner = module(last_inner)
+            if is_downsample:
+                stage += 1
+                last_inner = torch.cat([last_inner, inners[stage]], dim=1)
+            else:
+                results.append(last_inner)
+            is_downsample = not is_downsample
 
         return results
 
@@ -4,6 +4,7 @@ The transformer attention network blocks.
 
 Mostly copy-paste from <https://github.com/dingyiwei/yolov5/tree/Transformer>.
 """
+import torch
 from torch import nn
 
 from .common import Conv, C3
@@ -22,6 +23,7 @@ def darknet_tan_backbone(
     pretrained: Optional[bool] = False,
     returned_layers: Optional[List[int]] = None,
     version: str = 'r4.0',
+    channels_last: bool = False,
 ):
     """
     Constructs a specified DarkNet backbone with TAN on top. Freezes the specified number of
@@ -35,11 +37,11 @@ def darknet_tan_backbone(
         >>> x = torch.rand(1, 3, 64, 64)
         >>> # compute the output
         >>> output = backbone(x)
-        >>> print([(k, v.shape) for k, v in output.items()])
+        >>> print([v.shape for v in output])
         >>> # returns
-        >>>   [('0', torch.Size([1, 128, 8, 8])),
-        >>>    ('1', torch.Size([1, 256, 4, 4])),
-        >>>    ('2', torch.Size([1, 512, 2, 2]))]
+        >>>   [torch.Size([1, 128, 8, 8]),
+        >>>    torch.Size([1, 256, 4, 4]),
+        >>>    torch.Size([1, 512, 2, 2])]
 
     Args:
         backbone_name (string): darknet architecture. Possible values are 'DarkNet', 'darknet_s_r3_1',
@@ -50,6 +52,8 @@ def darknet_tan_backbone(
         trainable_layers (int): number of trainable (not frozen) darknet layers starting from final block.
             Valid values are between 0 and 5, with 5 meaning all backbone layers are trainable.
         version (str): ultralytics release version, currently only supports r3.1 or r4.0
+        channels_last (bool): If True, uses the channels last memory format for the weights and
+            the inputs, it is only faster with the CUDA kernels of the recent PyTorch. Default: False
     """
     backbone = darknet.__dict__[backbone_name](pretrained=pretrained).features
 
@@ -60,15 +64,22 @@ def darknet_tan_backbone(
 
     in_channels_list = [int(gw * width_multiple) for gw in [256, 512, 1024]]
 
-    return BackboneWithTAN(backbone, return_layers, in_channels_list, depth_multiple, version)
+    backbone = BackboneWithTAN(backbone, return_layers, in_channels_list, depth_multiple, version,
+                               channels_last=channels_last)
+    if channels_last:
+        backbone = backbone.to(memory_format=torch.channels_last)
+
+    return backbone
 
 
 class BackboneWithTAN(BackboneWithPAN):
     """
     Adds a TAN on top of a model.
     """
-    def __init__(self, backbone, return_layers, in_channels_list, depth_multiple, version):
-        super().__init__(backbone, return_layers, in_channels_list, depth_multiple, version)
+    def __init__(self, backbone, return_layers, in_channels_list, depth_multiple, version,
+                 channels_last=False):
+        super().__init__(backbone, return_layers, in_channels_list, depth_multiple, version,
+                         channels_last=channels_last)
         self.pan = TransformerAttentionNetwork(
             in_channels_list,
             depth_multiple,
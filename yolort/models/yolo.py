@@ -186,6 +186,8 @@ def _yolov5_darknet_pan(
     pretrained: bool = False,
     progress: bool = True,
     num_classes: int = 80,
+    gradient_checkpointing: bool = False,
+    channels_last: bool = False,
     **kwargs: Any,
 ) -> YOLO:
     """
@@ -201,8 +203,13 @@ def _yolov5_darknet_pan(
     Arguments:
         pretrained (bool): If True, returns a model pre-trained on COCO train2017
         progress (bool): If True, displays a progress bar of the download to stderr
+        gradient_checkpointing (bool): If True, checkpoints the backbone during training to
+            reduce the activation memory
+        channels_last (bool): If True, uses the channels last memory format in the backbone
     """
-    backbone = darknet_pan_backbone(backbone_name, depth_multiple, width_multiple, version=version)
+    backbone = darknet_pan_backbone(backbone_name, depth_multiple, width_multiple, version=version,
+                                    gradient_checkpointing=gradient_checkpointing,
+                                    channels_last=channels_last)
 
     model = YOLO(backbone, num_classes, **kwargs)
     if pretrained:
@@ -317,12 +324,13 @@ def yolov5_darknet_pan_l_r40(pretrained: bool = False, progress: bool = True, nu
 
 
 def yolov5_darknet_tan_s_r40(pretrained: bool = False, progress: bool = True, num_classes: int = 80,
-                             **kwargs: Any) -> YOLO:
+                             channels_last: bool = False, **kwargs: Any) -> YOLO:
     r"""yolov5 small with a transformer block model from
     `"dingyiwei/yolov5" <https://github.com/ultralytics/yolov5/pull/2333>`_.
     Args:
         pretrained (bool): If True, returns a model pre-trained on ImageNet
         progress (bool): If True, displays a progress bar of the download to stderr
+        channels_last (bool): If True, uses the channels last memory format in the backbone
     """
     backbone_name = 'darknet_s_r4_0'
     weights_name = 'yolov5_darknet_tan_s_r40_coco'
@@ -330,7 +338,8 @@ def yolov5_darknet_tan_s_r40(pretrained: bool = False, progress: bool = True, nu
     width_multiple = 0.5
     version = 'r4.0'
 
-    backbone = darknet_tan_backbone(backbone_name, depth_multiple, width_multiple, version=version)
+    backbone = darknet_tan_backbone(backbone_name, depth_multiple, width_multiple, version=version,
+                                    channels_last=channels_last)
 
     model = YOLO(backbone, num_classes, **kwargs)
     if pretrained:
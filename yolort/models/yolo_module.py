@@ -163,7 +163,7 @@ class YOLOModule(LightningModule):
         The test step.
         """
         images, targets = batch
-        images = list(image.to(next(self.parameters()).device) for image in images)
+        images = list(image.to(next(self.parameters()).device, non_blocking=True) for image in images)
         preds = self._forward_impl(images)
         results = self.evaluator(preds, targets)
         # log step metric
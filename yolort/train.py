@@ -16,6 +16,9 @@ def get_args_parser():
                         help='number of total epochs to run')
     parser.add_argument('--num_gpus', default=1, type=int, metavar='N',
                         help='number of gpu utilizing (default: 1)')
+    parser.add_argument('--precision', default=None, type=int, choices=[16, 32],
+                        help='training precision, 16 enables the automatic mixed precision, '
+                        'which is only supported on gpus (default: 16 on gpus, 32 otherwise)')
 
     parser.add_argument('--data_path', default='./data-bin',
                         help='root path of the dataset')
@@ -50,8 +53,13 @@ def main(args):
     # Build the model
     model = models.__dict__[args.arch](num_classes=datamodule.num_classes)
 
+    # Use the automatic mixed precision by default when training on gpus
+    precision = args.precision
+    if precision is None:
+        precision = 16 if args.num_gpus > 0 else 32
+
     # Create the trainer. Run twice on data
-    trainer = pl.Trainer(max_epochs=args.max_epochs, gpus=args.num_gpus)
+    trainer = pl.Trainer(max_epochs=args.max_epochs, gpus=args.num_gpus, precision=precision)
 
     # Train the model
     trainer.fit(model, datamodule=datamodule)